@@ -9,7 +9,12 @@ Full import: `from cspy import Variable, Constraint, CSP`
 
 import copy
 import pprint
+import asyncio
+import functools
+import threading
 from cspy.solver import Solver
+from cspy.model import CompiledCSP
+from cspy.cache import CachedPredicate
 
 
 class Variable(object):
@@ -20,7 +25,8 @@ class Variable(object):
     def __init__(self, name, domain=(), value=None):
         self.name = name
         self.domain = domain
-        self.init_domain = copy.deepcopy(domain)
+        # immutable domains (e.g. those of compiled models) can safely be shared
+        self.init_domain = domain if isinstance(domain, frozenset) else copy.deepcopy(domain)
         self.value = value  # in theory, only the solver should assign this attribute
 
     @staticmethod
@@ -100,20 +106,44 @@ class Constraint(object):
     in `CSPy`, every constraint is represented by (a) an ordered tuple of variable names
     and (b) a function which takes in the variables associated with those names
     and returns True or False depending on whether or not the constraint has been met.
+
+    Constraints created by the constructors in `common_constraints` also record their kind (as `name`)
+    and `params`, which is what allows them to be serialized.
+
+    If PURE is True, the function's results are assumed to depend only on the variables' values
+    and are memoized (keeping up to CACHE_SIZE of them, or all of them if CACHE_SIZE is None).
     """
-    def __init__(self, var_names, satisfied, name=None):
+    def __init__(self, var_names, satisfied, name=None, params=(), pure=False, cache_size=4096):
         try:
             self.var_names = tuple(var_names)  # names of variables involved in the constraint
         except TypeError:
             self.var_names = (var_names,)
             print('WARNING: `var_names` is not a collection; casting it to one automatically')
         self.satisfied = satisfied  # fn: (vars, in order specified by `var_names`) -> True/False
+        if pure:
+            self.satisfied = CachedPredicate(satisfied, cache_size)
         self.name = name
+        self.params = tuple(params)  # parameters of built-in constraint kinds (see `common_constraints`)
 
     def __contains__(self, value):
         """Check whether or not a variable (identified by its name) is involved in the constraint."""
         return value in self.var_names
 
+    def cache_info(self):
+        """Returns the hit/miss statistics of the constraint's cache, or None if it isn't cached."""
+        if isinstance(self.satisfied, CachedPredicate):
+            return self.satisfied.cache_info()
+        return None
+
+    def warm_cache(self, domains):
+        """Pre-computes the cached results for every combination of values in DOMAINS
+        (one domain per variable, in the order given by `var_names`).
+        Returns False if the constraint isn't cached, or if its cache can't hold them all.
+        """
+        if isinstance(self.satisfied, CachedPredicate):
+            return self.satisfied.warm(self.var_names, domains)
+        return False
+
 
 class CSP(object):
     """A constraint satisfaction problem (CSP).
@@ -125,12 +155,17 @@ class CSP(object):
         self.var_dict = {var.name: var for var in variables}
         self.constraints = list(constraints)
         self.objective_fn = objective_fn
+        self.model = None  # the compiled model this CSP was instantiated from, if any
 
     def reset(self):
         """Unassigns all variables and re-initializes their domains."""
         for var in self.var_list:
             var.value = None
-            var.domain = copy.deepcopy(var.init_domain)
+            var.domain = copy.copy(var.init_domain)
+
+    def compile(self):
+        """Returns a frozen `CompiledCSP` snapshot of this CSP, which solvers can share read-only."""
+        return CompiledCSP.from_csp(self)
 
     def add_variable(self, var):
         """Adds a variable to the registry of the CSP."""
@@ -147,6 +182,19 @@ class CSP(object):
         and return a scalar representing the quantity to be maximized."""
         self.objective_fn = objective_fn
 
+    def warm_caches(self, max_tuples=4096):
+        """Pre-warms the cache of every pure constraint with at most MAX_TUPLES combinations of values
+        (and no more than its cache can hold)."""
+        for constraint in self.constraints:
+            if constraint.cache_info() is None:
+                continue
+            domains = [self.var_dict[name].domain for name in constraint.var_names]
+            num_tuples = 1
+            for domain in domains:
+                num_tuples *= len(domain)
+            if num_tuples <= max_tuples:
+                constraint.warm_cache(domains)  # skipped if the constraint's own cache is too small
+
     def get_solution(self, algorithm='backtracking', **kwargs):
         """Returns the optimal solution as defined by the constraints and the objective function.
         If no objective function exists, returns an arbitrary valid solution.
@@ -161,6 +209,40 @@ class CSP(object):
         """
         return Solver(self).solve(algorithm=algorithm, take_first=False, **kwargs)
 
+    async def solve_async(self, algorithm='backtracking', timeout=None, node_limit=None,
+                          take_first=True, executor=None, **kwargs):
+        """Asynchronous counterpart to `get_solution` (or `get_all_solutions` if TAKE_FIRST is False).
+        The search runs in a worker thread (or in EXECUTOR, if one is given) so that the event loop isn't blocked,
+        and stops cooperatively after TIMEOUT seconds / NODE_LIMIT nodes or when the awaiting task is cancelled.
+
+        Returns a (solution, stats) tuple; see `Solver.solve` for the contents of `stats`.
+        If the search was cut short while looking for a single solution,
+        `solution` is the best partial assignment found (check `stats['status']`).
+        """
+        solver = Solver(self)
+        cancel_event = threading.Event()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(solver.solve, algorithm=algorithm, take_first=take_first, time_limit=timeout,
+                                 node_limit=node_limit, cancel_event=cancel_event, **kwargs)
+        try:
+            solution = await loop.run_in_executor(executor, call)
+        except asyncio.CancelledError:
+            cancel_event.set()  # the worker notices at its next check and winds down
+            raise
+        if take_first and solution is None and solver.stats['status'] in ('timeout', 'node_limit', 'cancelled'):
+            solution = solver.stats['best']
+        return solution, solver.stats
+
+    def count_solutions(self, **kwargs):
+        """Returns the number of solutions to the CSP, counted by dynamic programming over a tree decomposition
+        (which is fast if the constraint graph is close to a tree). Returns None if the count was cut short.
+        """
+        solver = Solver(self)
+        solver.solve(algorithm='tree_decomposition', **kwargs)
+        if solver.stats['status'] not in ('solved', 'infeasible'):
+            return None
+        return solver.stats.get('count', 0)
+
     def all_variables_assigned(self):
         return all(var.value is not None for var in self.var_list)
 
@@ -178,6 +260,8 @@ class CSP(object):
 
     def get_constraints_with(self, var):
         """Return all constraints involving VAR."""
+        if self.model is not None:
+            return self.model.constraints_with(var.name)
         return [c for c in self.constraints if var.name in c.var_names]
 
     def solved(self):
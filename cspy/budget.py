@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+"""
+budget.py
+
+Time/node budgets and cooperative cancellation for the search algorithms.
+A budget is ticked once per search node; the (comparatively expensive) clock
+and cancellation checks only happen every `check_freq` ticks.
+Units of work that cost far more than a search node (local search iterations, scoring a value for
+value ordering, revising an arc during presolve) are counted with `step` instead, which checks every time.
+"""
+
+import time
+
+
+class BudgetExhausted(Exception):
+    """Raised from within a search when its budget has run out or it has been cancelled."""
+    def __init__(self, status):
+        super(BudgetExhausted, self).__init__(status)
+        self.status = status
+
+
+class Budget(object):
+    """A search budget.
+    TIME_LIMIT is in seconds, NODE_LIMIT is a number of search nodes (or local search iterations),
+    and CANCEL_EVENT is anything with an `is_set()` method (e.g. a `threading.Event`).
+    Any of them may be None, in which case that particular limit does not apply.
+    """
+    def __init__(self, time_limit=None, node_limit=None, cancel_event=None, check_freq=256):
+        self.start_time = time.time()
+        self.deadline = None if time_limit is None else self.start_time + time_limit
+        self.node_limit = node_limit
+        self.cancel_event = cancel_event
+        self.check_freq = max(1, int(check_freq))
+        self.nodes = 0
+        self.status = None  # set to 'timeout', 'node_limit' or 'cancelled' once exhausted
+        self.parent = None
+
+    def sub_budget(self, node_limit=None):
+        """Returns a budget for a sub-search with its own NODE_LIMIT.
+        It shares this budget's deadline and cancellation event, and its nodes count toward this budget as well.
+        """
+        sub = Budget(None, node_limit, self.cancel_event, self.check_freq)
+        sub.deadline = self.deadline
+        sub.parent = self
+        return sub
+
+    def tick(self):
+        """Counts one search node. Raises BudgetExhausted if the budget has run out."""
+        self.nodes += 1
+        if self.parent is not None:
+            self.parent.tick()
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            self._exhaust('node_limit')
+        if self.nodes % self.check_freq == 0:
+            self.check()
+
+    def step(self):
+        """Counts one expensive unit of work as a node, and checks the clock and the cancellation event right away."""
+        self.tick()
+        self.check()
+
+    def check(self):
+        """Checks the clock and the cancellation event (but doesn't count a node)."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self._exhaust('cancelled')
+        if self.deadline is not None and time.time() > self.deadline:
+            self._exhaust('timeout')
+
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    def _exhaust(self, status):
+        self.status = status
+        raise BudgetExhausted(status)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""
+cache.py
+
+Memoization for expensive constraint predicates.
+A constraint's variables are fixed, so a pure predicate's result only depends on the tuple of their values.
+"""
+
+import itertools
+from collections import OrderedDict
+
+
+class CachedPredicate(object):
+    """Wraps a constraint predicate FN, memoizing its results by the values of its arguments.
+    At most MAXSIZE results are kept (least recently used ones are evicted first); None means unbounded.
+    """
+    def __init__(self, fn, maxsize=4096):
+        self.fn = fn
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, *var_list):
+        key = tuple(var.value for var in var_list)
+        try:
+            result = self.cache[key]
+        except KeyError:
+            self.misses += 1
+            result = self.cache[key] = self.fn(*var_list)
+            if self.maxsize is not None and len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+            return result
+        except TypeError:  # unhashable values
+            self.misses += 1
+            return self.fn(*var_list)
+        self.hits += 1
+        self.cache.move_to_end(key)
+        return result
+
+    def cache_info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.cache), 'maxsize': self.maxsize}
+
+    def cache_clear(self):
+        self.cache.clear()
+        self.hits = self.misses = 0
+
+    def warm(self, var_names, domains):
+        """Evaluates the predicate on every combination of values from DOMAINS (one per variable in VAR_NAMES).
+        The lookups made while warming don't count as hits or misses.
+        Does nothing (and returns False) if there are more combinations than the cache can hold,
+        since the later results would only evict the earlier ones.
+        """
+        from cspy import Variable
+        if self.maxsize is not None:
+            num_tuples = 1
+            for domain in domains:
+                num_tuples *= len(domain)
+            if num_tuples > self.maxsize:
+                return False
+        probes = [Variable(name, ()) for name in var_names]
+        hits, misses = self.hits, self.misses
+        for values in itertools.product(*domains):
+            for probe, value in zip(probes, values):
+                probe.value = value
+            self(*probes)
+        self.hits, self.misses = hits, misses
+        return True
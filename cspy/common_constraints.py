@@ -10,9 +10,19 @@ in `CSPy`, every constraint takes in a dictionary containing all of the variable
 and returns True or False depending on whether or not the constraint has been met.
 """
 
+import operator
 import itertools
 from cspy import Constraint
 
+LINEAR_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<=': operator.le,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '>': operator.gt,
+}
+
 
 def uniqueness(var_names, pairwise=False):
     """Creates a Constraint on the given variable names which specifies
@@ -31,11 +41,43 @@ def uniqueness(var_names, pairwise=False):
     return Constraint(var_names, _satisfied, name='uniqueness')
 
 
+def _values_differ(v0, v1):
+    return v0.value != v1.value
+
+
 def inequality(name0, name1):
     """Creates a Constraint on the two variables which specifies that their values must be different."""
-    return Constraint((name0, name1), lambda v0, v1: v0.value != v1.value)
+    return Constraint((name0, name1), _values_differ, name='inequality')
 
 
 def inequality_unary(name, constant):
     """Creates a Constraint on one variable which specifies that its value != CONSTANT."""
-    return Constraint((name,), lambda v: v.value != constant)
+    return Constraint((name,), lambda v: v.value != constant, name='inequality_unary', params=(constant,))
+
+
+def table(var_names, tuples):
+    """Creates an extensional Constraint: the values of the given variables, as a tuple,
+    must be one of the allowed TUPLES (a collection of tuples; sets and other containers are used as is).
+    """
+    if isinstance(tuples, (list, tuple)) or not hasattr(tuples, '__contains__'):
+        tuples = frozenset(tuple(t) for t in tuples)
+    def _satisfied(*var_list):
+        values = tuple(var.value for var in var_list)
+        if None in values:
+            return True  # not qualified to make a decision yet
+        return values in tuples
+    return Constraint(var_names, _satisfied, name='table', params=(tuples,))
+
+
+def linear(var_names, coeffs, op, rhs):
+    """Creates a Constraint which specifies that sum(COEFFS[i] * value of VAR_NAMES[i]) <OP> RHS,
+    where OP is one of '==', '!=', '<=', '<', '>=', '>'.
+    """
+    compare = LINEAR_OPERATORS[op]
+    coeffs = tuple(coeffs)
+    def _satisfied(*var_list):
+        values = [var.value for var in var_list]
+        if None in values:
+            return True  # not qualified to make a decision yet
+        return compare(sum(coeff * value for coeff, value in zip(coeffs, values)), rhs)
+    return Constraint(var_names, _satisfied, name='linear', params=(coeffs, op, rhs))
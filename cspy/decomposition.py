@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+"""
+decomposition.py
+
+Tree decompositions of constraint graphs, and dynamic programming over them.
+
+Variables are eliminated one at a time (fewest neighbors first); eliminating variable v creates the bag
+{v} + (v's remaining neighbors), and those neighbors are the bag's separator from the rest of the tree.
+Each constraint is checked in the bag of the first of its variables to be eliminated.
+Bags are processed bottom-up (in elimination order), counting the extensions of every consistent bag
+assignment into its subtree and discarding those without any (directional arc consistency).
+Solutions can then be read off top-down without backtracking.
+The work is exponential only in the width of the decomposition (the size of the largest bag, minus one).
+"""
+
+import heapq
+
+
+class TreeDecomposition(object):
+    """A tree decomposition of MODEL's (a `CompiledCSP`'s) constraint graph."""
+    def __init__(self, model):
+        self.model = model
+        n = len(model)
+        adjacency = [set() for _ in range(n)]
+        for scope in model.scopes:
+            for i in scope:
+                adjacency[i].update(scope)
+        for i in range(n):
+            adjacency[i].discard(i)
+
+        # Greedy min-degree elimination
+        self.order, self.separators = [], [None] * n
+        eliminated = [False] * n
+        heap = [(len(adjacency[i]), i) for i in range(n)]
+        heapq.heapify(heap)
+        while heap:
+            degree, v = heapq.heappop(heap)
+            if eliminated[v] or degree != len(adjacency[v]):
+                continue  # stale entry
+            eliminated[v] = True
+            self.order.append(v)
+            neighbors = adjacency[v]
+            self.separators[v] = tuple(sorted(neighbors))
+            for u in neighbors:
+                adjacency[u].discard(v)
+                adjacency[u].update(w for w in neighbors if w != u)
+                heapq.heappush(heap, (len(adjacency[u]), u))
+            adjacency[v] = set()
+
+        position = [0] * n
+        for k, v in enumerate(self.order):
+            position[v] = k
+        # The parent of v's bag is the bag of v's separator variable that is eliminated first
+        self.parent = [min(sep, key=position.__getitem__) if sep else None for sep in self.separators]
+        self.children = [[] for _ in range(n)]
+        for v, p in enumerate(self.parent):
+            if p is not None:
+                self.children[p].append(v)
+        self.bag_constraints = [[] for _ in range(n)]
+        for j, scope in enumerate(model.scopes):
+            if scope:
+                self.bag_constraints[min(scope, key=position.__getitem__)].append(j)
+        self.width = max([len(sep) for sep in self.separators] or [0])
+        self.tables = None
+
+    def bag(self, v):
+        """Returns the ids of the variables in the bag created by eliminating variable V (V first)."""
+        return (v,) + self.separators[v]
+
+    def count_tables(self, budget=None):
+        """Runs the bottom-up pass. For every bag, builds a {separator values: {value of v: count}} table
+        of the consistent bag assignments with at least one extension into the subtree.
+        """
+        from cspy import Variable
+        model = self.model
+        probes = [Variable(name, domain) for name, domain in zip(model.var_names, model.domains)]
+        tables, totals = [None] * len(model), [None] * len(model)
+        for v in self.order:
+            bag = self.bag(v)
+            slot = {u: k for k, u in enumerate(bag)}
+            # The separator is assigned first, then v; each check runs as soon as its last variable is assigned
+            enumeration_order = list(range(1, len(bag))) + [0]
+            rank = {k: depth for depth, k in enumerate(enumeration_order)}
+            checks = [[] for _ in bag]
+            for j in self.bag_constraints[v]:
+                scope = model.scopes[j]
+                last = max((slot[u] for u in scope), key=rank.__getitem__)
+                checks[last].append((model.constraints[j], [probes[u] for u in scope]))
+            for c in self.children[v]:
+                sep_slots = [slot[u] for u in self.separators[c]]
+                last = max(sep_slots, key=rank.__getitem__)
+                checks[last].append((None, (totals[c], sep_slots)))
+            table = {}
+            values = [None] * len(bag)
+
+            def _enumerate(depth, count):
+                if budget is not None:
+                    budget.tick()
+                if depth == len(bag):
+                    key = tuple(values[1:])
+                    counts = table.setdefault(key, {})
+                    counts[values[0]] = counts.get(values[0], 0) + count
+                    return
+                k = enumeration_order[depth]
+                u = bag[k]
+                for value in model.domains[u]:
+                    values[k] = probes[u].value = value
+                    _count = count
+                    for constraint, args in checks[k]:
+                        if constraint is None:  # number of extensions into a child's subtree
+                            child_totals, sep_slots = args
+                            _count *= child_totals.get(tuple(values[s] for s in sep_slots), 0)
+                        elif not constraint.satisfied(*args):
+                            _count = 0
+                        if not _count:
+                            break
+                    if _count:
+                        _enumerate(depth + 1, _count)
+                values[k] = probes[u].value = None
+
+            _enumerate(0, 1)
+            tables[v] = table
+            totals[v] = {key: sum(counts.values()) for key, counts in table.items()}
+        self.tables = tables
+        return tables
+
+    def count(self, budget=None):
+        """Returns the number of solutions."""
+        if self.tables is None:
+            self.count_tables(budget)
+        total = 1
+        for v in self.order:
+            if self.parent[v] is None:
+                total *= sum(self.tables[v].get((), {}).values())
+        return total
+
+    def solutions(self, budget=None):
+        """Yields every solution as a {name: value} dictionary, without backtracking into dead ends."""
+        if self.tables is None:
+            self.count_tables(budget)
+        if not self.count():
+            return
+        model = self.model
+        top_down = self.order[::-1]  # parents before children
+        if not top_down:
+            yield {}
+            return
+        values = [None] * len(model)
+
+        def _candidates(v):
+            """Values of V with extensions, given the values already chosen for its separator."""
+            return iter(self.tables[v].get(tuple(values[u] for u in self.separators[v]), ()))
+
+        # Iterative depth-first enumeration (the tree may be far deeper than Python's recursion limit)
+        iterators = [_candidates(top_down[0])]
+        while iterators:
+            k = len(iterators) - 1
+            v = top_down[k]
+            value = next(iterators[k], None)
+            if value is None:  # exhausted
+                values[v] = None
+                iterators.pop()
+                continue
+            values[v] = value
+            if k + 1 == len(top_down):
+                yield dict(zip(model.var_names, values))
+            else:
+                iterators.append(_candidates(top_down[k + 1]))
+
+    def first_solution(self, budget=None):
+        """Returns one solution, or None if there are none."""
+        return next(self.solutions(budget), None)
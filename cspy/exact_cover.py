@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+"""
+exact_cover.py
+
+Exact cover formulations of CSPs, solved with Knuth's Algorithm X using (array-based) Dancing Links.
+
+Every (variable, value) pair becomes a row. Every variable has a primary column, so that it receives exactly
+one value. Every group of variables that must take different values (from `uniqueness` constraints, or from
+cliques of pairwise `inequality` constraints) gets a column per value. These columns are primary if the group
+has as many variables as candidate values, since each value must then be used exactly once.
+Otherwise they are secondary, meaning each value may be used at most once.
+Unary constraints simply remove rows. No other kind of constraint can be expressed.
+"""
+
+
+class DancingLinks(object):
+    """An exact cover problem over NUM_PRIMARY primary and NUM_SECONDARY secondary columns.
+    ROWS is a list of rows, each one a list of column indices (primary columns come first).
+    """
+    def __init__(self, num_primary, num_secondary, rows):
+        num_columns = num_primary + num_secondary
+        # Node 0 is the root; nodes 1..num_columns are the column headers
+        self.L = list(range(-1, num_columns))
+        self.R = list(range(1, num_columns + 2))
+        self.L[0], self.R[num_primary] = num_primary, 0
+        for c in range(num_primary + 1, num_columns + 1):  # secondary headers aren't linked to the root
+            self.L[c] = self.R[c] = c
+        self.U = list(range(num_columns + 1))
+        self.D = list(range(num_columns + 1))
+        self.C = list(range(num_columns + 1))
+        self.S = [0] * (num_columns + 1)
+        self.row_of = [None] * (num_columns + 1)
+        for r, columns in enumerate(rows):
+            first = None
+            for column in columns:
+                c = column + 1
+                node = len(self.C)
+                self.C.append(c)
+                self.row_of.append(r)
+                self.U.append(self.U[c])
+                self.D.append(c)
+                self.D[self.U[c]] = node
+                self.U[c] = node
+                self.S[c] += 1
+                if first is None:
+                    first = node
+                    self.L.append(node)
+                    self.R.append(node)
+                else:
+                    self.L.append(self.L[first])
+                    self.R.append(first)
+                    self.R[self.L[first]] = node
+                    self.L[first] = node
+
+    def _cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        L[R[c]], R[L[c]] = L[c], R[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]], D[U[j]] = U[j], D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def _uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[c]] = R[L[c]] = c
+
+    def _cover_row(self, r):
+        j = self.R[r]
+        while j != r:
+            self._cover(self.C[j])
+            j = self.R[j]
+
+    def _uncover_row(self, r):
+        j = self.L[r]
+        while j != r:
+            self._uncover(self.C[j])
+            j = self.L[j]
+
+    def solutions(self, budget=None):
+        """Yields every exact cover as a list of row indices (iteratively, so arbitrarily deep covers are fine)."""
+        R, D, C, S = self.R, self.D, self.C, self.S
+        chosen = []  # the node through which each chosen row was selected
+        while True:
+            if budget is not None:
+                budget.tick()
+            backtrack = True
+            if R[0] == 0:
+                yield [self.row_of[r] for r in chosen]
+            else:
+                # Branch on the primary column with the fewest rows left
+                c, best, size = R[0], R[0], S[R[0]]
+                while c != 0 and size:
+                    if S[c] < size:
+                        best, size = c, S[c]
+                    c = R[c]
+                if size:
+                    self._cover(best)
+                    chosen.append(D[best])
+                    self._cover_row(D[best])
+                    backtrack = False
+            if backtrack:
+                while chosen:
+                    r = chosen.pop()
+                    self._uncover_row(r)
+                    c, r = C[r], D[r]
+                    if r != c:
+                        chosen.append(r)
+                        self._cover_row(r)
+                        break
+                    self._uncover(c)
+                else:
+                    return
+
+
+def _cliques(edges, num_vars):
+    """Greedily covers the graph given by EDGES (pairs of variable ids) with cliques."""
+    adjacency = [set() for _ in range(num_vars)]
+    for a, b in edges:
+        adjacency[a].add(b)
+        adjacency[b].add(a)
+    uncovered = set(frozenset(edge) for edge in edges)
+    cliques = []
+    for edge in sorted(tuple(sorted(edge)) for edge in uncovered):
+        if frozenset(edge) not in uncovered:
+            continue
+        clique = list(edge)
+        candidates = adjacency[edge[0]] & adjacency[edge[1]]
+        while candidates:
+            # prefer the candidate adding the most uncovered edges
+            w = max(sorted(candidates), key=lambda u: sum(frozenset((u, v)) in uncovered for v in clique))
+            clique.append(w)
+            candidates &= adjacency[w]
+        for a in clique:
+            for b in clique:
+                uncovered.discard(frozenset((a, b)))
+        cliques.append(clique)
+    return cliques
+
+
+class ExactCover(object):
+    """The exact cover formulation of MODEL (a `CompiledCSP`).
+    Raises ValueError if MODEL has constraints that can't be expressed as exact cover.
+    """
+    def __init__(self, model):
+        from cspy import Variable
+        self.model = model
+        domains = [set(domain) for domain in model.domains]
+        groups, edges = [], []
+        for constraint, scope in zip(model.constraints, model.scopes):
+            if len(set(scope)) == 1:
+                probe = Variable(model.var_names[scope[0]], ())
+                args = [probe] * len(scope)
+                for value in list(domains[scope[0]]):
+                    probe.value = value
+                    if not constraint.satisfied(*args):
+                        domains[scope[0]].discard(value)
+            elif constraint.name == 'uniqueness':
+                groups.append(sorted(set(scope)))
+            elif constraint.name == 'inequality':
+                edges.append(scope)
+            else:
+                raise ValueError('constraint %r on %r cannot be expressed as exact cover'
+                                 % (constraint.name, constraint.var_names))
+        groups.extend(_cliques(edges, len(model)))
+
+        # Columns: one per variable, then one per (group, value)
+        primary, secondary = [], []
+        for g, group in enumerate(groups):
+            values = set().union(*[domains[i] for i in group])
+            target = primary if len(values) == len(group) else secondary
+            target.extend((g, value) for value in values)
+        column_of = {}
+        for k, key in enumerate(primary + secondary):
+            column_of[key] = len(model) + k
+        groups_of = [[] for _ in range(len(model))]
+        for g, group in enumerate(groups):
+            for i in group:
+                groups_of[i].append(g)
+
+        self.rows, row_columns = [], []
+        for i, domain in enumerate(domains):
+            for value in domain:
+                self.rows.append((i, value))
+                row_columns.append([i] + [column_of[(g, value)] for g in groups_of[i]])
+        self.links = DancingLinks(len(model) + len(primary), len(secondary), row_columns)
+
+    def solutions(self, budget=None):
+        """Yields every solution as a {name: value} dictionary."""
+        names = self.model.var_names
+        for cover in self.links.solutions(budget):
+            yield {names[self.rows[r][0]]: self.rows[r][1] for r in cover}
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+"""
+model.py
+
+Compiled (frozen) CSP models.
+A compiled model is an immutable snapshot of a CSP: variables are identified by integer ids,
+domains are frozensets, and every variable knows which constraints it is involved in.
+Solvers share a compiled model read-only and keep only their own mutable search state.
+"""
+
+
+def _scopes(constraints, var_ids):
+    """Returns the scope (tuple of variable ids) of every constraint in CONSTRAINTS."""
+    var_id = var_ids.__getitem__
+    return tuple([tuple(map(var_id, c.var_names)) for c in constraints])
+
+
+def _add_incidence(incidence, scopes, offset=0):
+    """Records constraint OFFSET + j in INCIDENCE (a list of lists, one per variable) for every j-th scope in SCOPES."""
+    for j, scope in enumerate(scopes, offset):
+        if len(scope) == 2 and scope[0] != scope[1]:  # the common case, without building a set
+            incidence[scope[0]].append(j)
+            incidence[scope[1]].append(j)
+        else:
+            for i in set(scope):
+                incidence[i].append(j)
+
+
+def _var_constraints(constraints, incidence):
+    constraint = constraints.__getitem__
+    return tuple([tuple(map(constraint, js)) for js in incidence])
+
+
+class CompiledCSP(object):
+    """An immutable, compact representation of a CSP.
+
+    - `var_names[i]` is the name of variable i, and `var_ids` maps names back to ids
+    - `domains[i]` is the (frozen) domain of variable i
+    - `values[i]` is the value that variable i was fixed to at compile time (usually None)
+    - `scopes[j]` holds the ids of the variables involved in `constraints[j]`
+    - `incidence[i]` holds the ids of the constraints involving variable i
+    """
+    __slots__ = ('var_names', 'var_ids', 'domains', 'values', 'constraints', 'scopes',
+                 'incidence', 'var_constraints', 'objective_fn')
+
+    def __init__(self, var_names, domains, constraints, values=None, objective_fn=None):
+        var_names = tuple(var_names)
+        var_ids = {name: i for i, name in enumerate(var_names)}
+        constraints = tuple(constraints)
+        scopes = _scopes(constraints, var_ids)
+        incidence = [[] for _ in var_names]
+        _add_incidence(incidence, scopes)
+        _set = object.__setattr__
+        _set(self, 'var_names', var_names)
+        _set(self, 'var_ids', var_ids)
+        _set(self, 'domains', tuple(frozenset(domain) for domain in domains))
+        _set(self, 'values', tuple(values) if values is not None else (None,) * len(var_names))
+        _set(self, 'constraints', constraints)
+        _set(self, 'scopes', scopes)
+        _set(self, 'incidence', tuple(map(tuple, incidence)))
+        _set(self, 'var_constraints', _var_constraints(constraints, incidence))
+        _set(self, 'objective_fn', objective_fn)
+
+    @classmethod
+    def from_csp(cls, csp):
+        """Compiles CSP. Variables that already have a value are fixed to that value."""
+        domains = [var.domain if var.value is None else (var.value,) for var in csp.var_list]
+        return cls([var.name for var in csp.var_list], domains, csp.constraints,
+                   [var.value for var in csp.var_list], csp.objective_fn)
+
+    def with_constraints(self, constraints):
+        """Returns a new model with CONSTRAINTS added.
+        Everything but the constraint tables is shared with this model.
+        """
+        constraints = tuple(constraints)
+        if not constraints:
+            return self
+        new_scopes = _scopes(constraints, self.var_ids)
+        incidence = [list(js) for js in self.incidence]
+        _add_incidence(incidence, new_scopes, len(self.constraints))
+        all_constraints = self.constraints + constraints
+        model = object.__new__(CompiledCSP)
+        _set = object.__setattr__
+        for attr in ('var_names', 'var_ids', 'domains', 'values', 'objective_fn'):
+            _set(model, attr, getattr(self, attr))
+        _set(model, 'constraints', all_constraints)
+        _set(model, 'scopes', self.scopes + new_scopes)
+        _set(model, 'incidence', tuple(map(tuple, incidence)))
+        _set(model, 'var_constraints', _var_constraints(all_constraints, incidence))
+        return model
+
+    def with_domains(self, domains):
+        """Returns a new model in which the variables named in DOMAINS ({name: domain}) have their domains
+        restricted (intersected) accordingly. Everything but the domain table is shared with this model.
+        """
+        new_domains = list(self.domains)
+        for name, domain in domains.items():
+            i = self.var_ids[name]
+            new_domains[i] = new_domains[i].intersection(domain)
+        model = object.__new__(CompiledCSP)
+        _set = object.__setattr__
+        for attr in CompiledCSP.__slots__:
+            _set(model, attr, getattr(self, attr))
+        _set(model, 'domains', tuple(new_domains))
+        return model
+
+    def __setattr__(self, name, value):
+        raise AttributeError('compiled models are immutable')
+
+    def __len__(self):
+        return len(self.var_names)
+
+    def constraints_with(self, var_name):
+        """Return all constraints involving the variable named VAR_NAME."""
+        return self.var_constraints[self.var_ids[var_name]]
+
+    def new_state(self, domains=None):
+        """Returns fresh, mutable search state for this model: a CSP made up of new variables.
+        Domains and constraints are shared with the model rather than copied.
+        DOMAINS optionally maps variable names to (restricted) domains that should be used instead.
+        """
+        from cspy import Variable, CSP
+        variables = []
+        for name, domain, value in zip(self.var_names, self.domains, self.values):
+            if domains is not None and name in domains:
+                domain = frozenset(domains[name])
+            variables.append(Variable(name, domain, value))
+        state = CSP(variables, self.constraints, self.objective_fn)
+        state.model = self
+        return state
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+"""
+presolve.py
+
+Presolving: simplifications applied to a compiled model before any search algorithm runs.
+- unary constraints are folded into the domains and dropped
+- arc consistency (AC-3) is enforced on binary constraints
+- constraints that can no longer be violated (entailed constraints) are dropped
+- an empty domain proves the problem infeasible without any search
+Presolving can also be incremental, starting from the domains of an earlier presolve.
+"""
+
+import itertools
+from collections import deque
+from cspy.model import CompiledCSP
+
+ENTAILMENT_CHECK_LIMIT = 256  # max number of tuples to enumerate when checking whether a constraint is entailed
+
+
+def _probes(model):
+    """Returns a throwaway variable per model variable, for evaluating constraints on candidate values."""
+    from cspy import Variable
+    return [Variable(name, domain) for name, domain in zip(model.var_names, model.domains)]
+
+
+def _satisfied(constraint, scope, probes, values):
+    for i, value in zip(scope, values):
+        probes[i].value = value
+    return constraint.satisfied(*[probes[i] for i in scope])
+
+
+def _revise(j, x, y, model, domains, probes):
+    """Removes the values of variable X with no support in variable Y under (binary) constraint J.
+    Returns the number of values removed.
+    """
+    satisfied = model.constraints[j].satisfied
+    args = [probes[i] for i in model.scopes[j]]
+    x_probe, y_probe = probes[x], probes[y]
+    kept = set()
+    for x_value in domains[x]:
+        x_probe.value = x_value
+        for y_value in domains[y]:
+            y_probe.value = y_value
+            if satisfied(*args):
+                kept.add(x_value)
+                break
+    num_removed = len(domains[x]) - len(kept)
+    if num_removed:
+        domains[x] = frozenset(kept)
+    return num_removed
+
+
+def presolve(model, consistency=True, budget=None, domains=None, changed_vars=(), new_constraints=(),
+             singletons_only=False):
+    """Simplifies MODEL (a `CompiledCSP`) without changing its set of solutions.
+    If CONSISTENCY is False, only unary constraints are folded and entailed constraints dropped.
+
+    To presolve incrementally, pass the DOMAINS (one per variable) of an earlier presolve of the same variables:
+    they must already be arc consistent with MODEL's constraints, except that the domains of the variables in
+    CHANGED_VARS (ids) may have shrunk since, and the constraints in NEW_CONSTRAINTS (ids) may have been added.
+    Only the arcs affected by those changes (or by unary constraints) are then revised.
+    If SINGLETONS_ONLY is also True, a domain that shrinks is only propagated further once it is down to
+    a single value. This is weaker than arc consistency, but much cheaper when few values are fixed
+    (e.g. by assumptions) in an otherwise arc consistent model.
+
+    If BUDGET (a `Budget`) is given, every arc revision counts as one of its nodes.
+
+    Returns a (model, stats) tuple. If the problem is found to be infeasible, `model` is None.
+    `stats` counts the 'constraints_removed' and 'values_removed', and records whether the problem is 'infeasible'.
+    """
+    probes = _probes(model)
+    init_size = sum(len(domain) for domain in model.domains)
+    incremental = domains is not None
+    domains = list(domains if incremental else model.domains)
+    stats = {'constraints_removed': 0, 'values_removed': 0, 'infeasible': False}
+    removed = set()
+
+    # Fold unary constraints into the domains
+    changed_vars = set(changed_vars)
+    for j, (constraint, scope) in enumerate(zip(model.constraints, model.scopes)):
+        if len(set(scope)) == 1:
+            i = scope[0]
+            domain = frozenset(v for v in domains[i] if _satisfied(constraint, scope, probes, (v,) * len(scope)))
+            if len(domain) < len(domains[i]):
+                domains[i] = domain
+                changed_vars.add(i)
+            removed.add(j)
+
+    # Arc consistency on binary constraints
+    if consistency and all(domains):
+        arcs = [(j, x, y) for j, scope in enumerate(model.scopes) if j not in removed and len(scope) == 2
+                for x, y in (scope, scope[::-1]) if x != y]
+        arcs_into = {}
+        for arc in arcs:
+            arcs_into.setdefault(arc[2], []).append(arc)  # arcs (j, x, y) that need revisiting when y shrinks
+        if incremental:
+            new_constraints = set(new_constraints)
+            arcs = [arc for arc in arcs if arc[0] in new_constraints]
+            arcs.extend(arc for y in sorted(changed_vars) for arc in arcs_into.get(y, ()))
+        queue, queued = deque(), set()
+        for arc in arcs:
+            if arc not in queued:
+                queue.append(arc)
+                queued.add(arc)
+        while queue:
+            if budget is not None:
+                budget.step()  # one node per arc revised
+            arc = queue.popleft()
+            queued.discard(arc)
+            j, x, y = arc
+            if _revise(j, x, y, model, domains, probes):
+                if not domains[x]:
+                    break
+                if singletons_only and incremental and len(domains[x]) > 1:
+                    continue
+                for _arc in arcs_into.get(x, ()):
+                    if _arc[0] != j and _arc not in queued:
+                        queue.append(_arc)
+                        queued.add(_arc)
+
+    stats['values_removed'] = init_size - sum(len(domain) for domain in domains)
+    if not all(domains):
+        stats['infeasible'] = True
+        stats['constraints_removed'] = len(removed)
+        return None, stats
+
+    # Drop entailed constraints, i.e. constraints satisfied by every combination of remaining values
+    for j, (constraint, scope) in enumerate(zip(model.constraints, model.scopes)):
+        if j in removed:
+            continue
+        size = 1
+        for i in scope:
+            size *= len(domains[i])
+        if size > ENTAILMENT_CHECK_LIMIT:
+            continue
+        tuples = itertools.product(*[domains[i] for i in scope])
+        if all(_satisfied(constraint, scope, probes, values) for values in tuples):
+            removed.add(j)
+        elif size == 1:
+            stats['infeasible'] = True  # a constraint violated by the only remaining assignment
+            stats['constraints_removed'] = len(removed)
+            return None, stats
+
+    stats['constraints_removed'] = len(removed)
+    if not removed and all(a is b for a, b in zip(domains, model.domains)):
+        return model, stats
+    constraints = [c for j, c in enumerate(model.constraints) if j not in removed]
+    return CompiledCSP(model.var_names, domains, constraints, model.values, model.objective_fn), stats
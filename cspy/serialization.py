@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+
+"""
+serialization.py
+
+Saving and loading CSPs.
+
+A model file is a stream of JSON records, one per line:
+
+    ["cspy", 2]
+    ["var", "x", [1, 2, 3]]
+    ["inequality", ["x", "y"]]
+    ["inequality_unary", ["x"], 3]
+    ["uniqueness", ["x", "y", "z"]]
+    ["table", ["x", "y"], [[1, 2], [2, 1]]]
+    ["linear", ["x", "y"], [1, -1], "<=", 3]
+
+Runs of consecutive records of the same kind are written as a single batch record (which holds the rest
+of every record), so that large models are parsed with a few big `json.loads` calls rather than one per line:
+
+    ["batch", "inequality", [[["x", "y"]], [["x", "z"]], [["y", "z"]]]]
+
+Only the constraint kinds defined in `common_constraints` can be saved.
+Large integer tables are written to a binary sidecar file as sorted rows of native ints;
+on load, the sidecar is memory-mapped and searched in place instead of being read into Python objects.
+Every dump writes a new sidecar with a unique name (`<path>.cspy-<token>.tables`), which its table records name,
+so that replacing the model file switches to the new tables in a single step.
+"""
+
+import gc
+import os
+import glob
+import sys
+import json
+import itertools
+import tempfile
+import mmap
+import array
+import bisect
+from cspy.model import CompiledCSP
+from cspy.common_constraints import uniqueness, inequality, inequality_unary, table, linear
+
+FORMAT_VERSION = 2  # version 1 files (without batch records) can still be loaded
+BATCH_SIZE = 4096  # max number of records per batch record
+BINARY_TABLE_MIN_ROWS = 1024  # smaller tables are written inline
+TABLE_SUFFIX = '.tables'
+SIDECAR_PREFIX = '.cspy-'
+
+
+class MappedTable(object):
+    """A read-only table of integer rows, stored sorted in a flat buffer (e.g. a memory-mapped file).
+    Supports `in`, `len` and iteration, which is all the `table` constraint needs.
+    """
+    def __init__(self, data, arity):
+        self.data = data  # flat sequence of ints, row-major
+        self.arity = arity
+
+    def __len__(self):
+        return len(self.data) // self.arity
+
+    def __getitem__(self, k):
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        return tuple(self.data[k * self.arity:(k + 1) * self.arity])
+
+    def __contains__(self, row):
+        row = tuple(row)
+        k = bisect.bisect_left(self, row)
+        return k < len(self) and self[k] == row
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+
+def _hashable(value):
+    """JSON turns tuples into lists; turns them back (recursively) so that values can live in sets."""
+    return tuple(_hashable(v) for v in value) if isinstance(value, list) else value
+
+
+def _binary_rows(rows):
+    """Returns ROWS as a sorted, flat `array` of ints if they can be stored in binary, else None."""
+    if len(rows) < BINARY_TABLE_MIN_ROWS:
+        return None
+    try:
+        return array.array('i', [value for row in sorted(rows) for value in row])
+    except (TypeError, OverflowError):
+        return None
+
+
+def _set_default_permissions(path):
+    """Gives PATH the permissions a plain `open` would have given it (temporary files are private)."""
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(path, 0o666 & ~umask)
+
+
+def _sidecars(path):
+    """Returns the paths of every sidecar written for the model at PATH (including a legacy `<path>.tables`)."""
+    sidecars = glob.glob(glob.escape(path + SIDECAR_PREFIX) + '*' + TABLE_SUFFIX)
+    if os.path.exists(path + TABLE_SUFFIX):
+        sidecars.append(path + TABLE_SUFFIX)
+    return sidecars
+
+
+def dump(csp, path):
+    """Saves CSP (a `CSP` or a `CompiledCSP`) to PATH, plus a binary sidecar for any large tables.
+    As when compiling, a variable that already has a value is saved with that value as its only one.
+    The sidecar gets a new, unique name, and the model file is written under a temporary name and only moved
+    into place once both are complete. Replacing the model file is the only step that changes which model
+    PATH holds, so a failed dump leaves any previous model (and the sidecar it refers to) intact.
+    A model loaded from PATH may also be dumped back to PATH, since its old sidecar is left alone until then;
+    sidecars of previous dumps are deleted afterward.
+    """
+    if isinstance(csp, CompiledCSP):
+        variables = zip(csp.var_names, csp.domains)
+        constraints = csp.constraints
+    else:
+        variables = [(var.name, var.domain if var.value is None else (var.value,)) for var in csp.var_list]
+        constraints = csp.constraints
+    directory, prefix = os.path.split(os.path.abspath(path))
+    model_file = tempfile.NamedTemporaryFile('w', dir=directory, prefix=prefix + '.', suffix='.tmp', delete=False)
+    sidecar = None
+
+    def _records():
+        nonlocal sidecar
+        for name, domain in variables:
+            yield ['var', name, list(domain)]
+        for constraint in constraints:
+            kind, names = constraint.name, list(constraint.var_names)
+            if kind in ('uniqueness', 'inequality'):
+                yield [kind, names]
+            elif kind in ('inequality_unary', 'linear'):
+                yield [kind, names] + [list(p) if isinstance(p, tuple) else p for p in constraint.params]
+            elif kind == 'table':
+                rows = [tuple(row) for row in constraint.params[0]]
+                flat = _binary_rows(rows)
+                if flat is None:
+                    yield [kind, names, [list(row) for row in rows]]
+                else:
+                    if sidecar is None:
+                        sidecar = tempfile.NamedTemporaryFile('wb', dir=directory, prefix=prefix + SIDECAR_PREFIX,
+                                                              suffix=TABLE_SUFFIX, delete=False)
+                    yield [kind, names, {'file': os.path.basename(sidecar.name), 'offset': sidecar.tell(),
+                                         'rows': len(rows), 'byteorder': sys.byteorder}]
+                    flat.tofile(sidecar)
+            else:
+                raise ValueError('cannot serialize constraint %r: only the kinds in `common_constraints` are supported'
+                                 % (kind,))
+
+    try:
+        with model_file as f:
+            f.write(json.dumps(['cspy', FORMAT_VERSION]) + '\n')
+            for kind, group in itertools.groupby(_records(), key=lambda record: record[0]):
+                while True:
+                    batch = list(itertools.islice(group, BATCH_SIZE))
+                    if not batch:
+                        break
+                    if len(batch) == 1:
+                        f.write(json.dumps(batch[0]) + '\n')
+                    else:
+                        f.write(json.dumps(['batch', kind, [record[1:] for record in batch]]) + '\n')
+        if sidecar is not None:
+            sidecar.close()
+            _set_default_permissions(sidecar.name)
+        _set_default_permissions(model_file.name)
+        os.replace(model_file.name, path)
+    except BaseException:
+        for tmp in (model_file, sidecar):
+            if tmp is not None:
+                tmp.close()
+                if os.path.exists(tmp.name):
+                    os.remove(tmp.name)
+        raise
+    for old_sidecar in _sidecars(path):
+        if sidecar is None or os.path.basename(old_sidecar) != os.path.basename(sidecar.name):
+            os.remove(old_sidecar)  # tables of a previous dump (still readable by models that have them mapped)
+
+
+def load(path, compiled=True):
+    """Loads the model saved at PATH.
+    Returns a `CompiledCSP` (built directly, without intermediate `Variable` objects) if COMPILED is True,
+    otherwise a `CSP`.
+    """
+    var_names, domains, constraints = [], [], []
+    tables = {}  # sidecar name -> its mapped contents
+    gc_enabled = gc.isenabled()
+    gc.disable()  # the loader allocates many objects but no reference cycles; don't keep scanning them
+    try:
+        with open(path) as f:
+            header = json.loads(f.readline())
+            if header[:1] != ['cspy'] or header[1] > FORMAT_VERSION:
+                raise ValueError('%s is not a supported cspy model file' % path)
+            for line in f:
+                record = json.loads(line)
+                if record[0] == 'batch':
+                    kind, items = record[1], record[2]
+                else:
+                    kind, items = record[0], [record[1:]]
+                if kind == 'var':
+                    for name, domain in items:
+                        var_names.append(name)
+                        domains.append([_hashable(v) for v in domain])
+                elif kind == 'inequality':
+                    constraints.extend([inequality(*names) for names, in items])
+                elif kind == 'inequality_unary':
+                    constraints.extend([inequality_unary(names[0], _hashable(constant)) for names, constant in items])
+                elif kind == 'uniqueness':
+                    constraints.extend([uniqueness(names) for names, in items])
+                elif kind == 'linear':
+                    constraints.extend([linear(*item) for item in items])
+                elif kind == 'table':
+                    for names, rows in items:
+                        if isinstance(rows, dict):
+                            sidecar = rows.get('file', os.path.basename(path) + TABLE_SUFFIX)
+                            if sidecar not in tables:
+                                tables[sidecar] = _map_tables(os.path.join(os.path.dirname(path), sidecar))
+                            rows = _mapped_table(tables[sidecar], rows, len(names))
+                        else:
+                            rows = [tuple(_hashable(v) for v in row) for row in rows]
+                        constraints.append(table(names, rows))
+                else:
+                    raise ValueError('unknown record kind %r in %s' % (kind, path))
+        model = CompiledCSP(var_names, domains, constraints)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return model if compiled else _to_csp(model)
+
+
+def _map_tables(path):
+    with open(path, 'rb') as f:
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def _mapped_table(tables, ref, arity):
+    itemsize = array.array('i').itemsize
+    start, stop = ref['offset'], ref['offset'] + ref['rows'] * arity * itemsize
+    if ref['byteorder'] == sys.byteorder:
+        data = tables[start:stop].cast('i')
+    else:
+        data = array.array('i', tables[start:stop].tobytes())
+        data.byteswap()
+    return MappedTable(data, arity)
+
+
+def _to_csp(model):
+    from cspy import Variable, CSP
+    return CSP([Variable(name, set(domain)) for name, domain in zip(model.var_names, model.domains)],
+               model.constraints)
@@ -7,6 +7,10 @@ Constraint satisfaction problem (CSP) solver.
 Options for solver algorithms:
 - backtracking
 - min_conflicts
+- permutation
+- lns (large neighborhood search)
+- tree_decomposition
+- exact_cover
 """
 
 import copy
@@ -14,50 +18,253 @@ import random
 import itertools
 from collections import defaultdict
 from cspy.utils import timed, merge_dicts
+from cspy.budget import Budget, BudgetExhausted
+from cspy.model import CompiledCSP
+from cspy.presolve import presolve as presolve_model
+from cspy.decomposition import TreeDecomposition
+from cspy.exact_cover import ExactCover
 
 
 class Solver(object):
     """A solver.
     A solver should be able to determine the solution set for a CSP.
     """
+    LOCAL_SEARCH_ALGORITHMS = ('min_conflicts', 'permutation', 'lns')
+
     def __init__(self, csp):
-        self.csp = csp
+        """CSP may be either a `CSP` or an already-compiled `CompiledCSP`."""
+        if isinstance(csp, CompiledCSP):
+            self.csp, self._base_model = None, csp
+        else:
+            self.csp, self._base_model = csp, None
+        self._model = self._base_model
+        self._scopes = [[]]  # constraints added through `add_constraint`, grouped by `push` level
+        self._assumptions = {}
+        self._search_model = None  # the (presolved) model being searched by the current solve
+        self._presolved = None
+        self._domain_order = {}  # learned value orderings, reused across solves
+        self.last_solution = None  # used to warm-start subsequent solves
         self.ALGORITHMS = {
             'backtracking': self.backtracking,
             'min_conflicts': self.min_conflicts,
+            'permutation': self.permutation_search,
+            'lns': self.lns,
+            'tree_decomposition': self.tree_decomposition,
+            'exact_cover': self.exact_cover,
         }
+        self.budget = Budget()
+        self.stats = {}
 
     @timed('The search')
-    def solve(self, algorithm='backtracking', take_first=True, **kwargs):
+    def solve(self, algorithm='backtracking', take_first=True, assumptions=None, presolve=True,
+              time_limit=None, node_limit=None, cancel_event=None, **kwargs):
         """Finds solutions to the solver's assigned CSP.
         If TAKE_FIRST is True, returns the first observed solution that is both optimal and valid.
         Otherwise, returns the set of all solutions.
+
+        The search gives up after TIME_LIMIT seconds or NODE_LIMIT search nodes (presolving and value ordering
+        count toward NODE_LIMIT too: one node per arc revised or value scored), or as soon as
+        CANCEL_EVENT (e.g. a `threading.Event`) is set. In that case it returns as if no solution
+        had been found (None, or the solutions found so far if TAKE_FIRST is False).
+        Either way, `self.stats` describes the run afterward: its 'status', the number of 'nodes' visited,
+        the time 'elapsed' and the 'best' (possibly partial) assignment seen.
+
+        ASSUMPTIONS is an optional {name: value} dictionary of values to fix for this solve only.
+        If PRESOLVE is True, the model is simplified before the search (see `cspy.presolve`)
+        and `self.stats['presolve']` reports what was removed. Local search algorithms skip the arc consistency pass.
+        The presolved model is kept between solves: assumptions and added constraints are propagated incrementally.
         """
-        try:
-            return self.ALGORITHMS[algorithm](take_first, **kwargs)
-        except KeyError:
+        if algorithm not in self.ALGORITHMS:
             raise NotImplementedError('algorithm %r not supported!' % algorithm)
+        self.budget = Budget(time_limit, node_limit, cancel_event)
+        self.stats = {'status': None, 'nodes': 0, 'elapsed': 0.0, 'best': None}
+        self._assumptions = dict(assumptions or {})
+        try:
+            model = self.model
+            # Arc consistency rarely pays off for local search, which doesn't branch on the domains
+            consistency = algorithm not in self.LOCAL_SEARCH_ALGORITHMS
+            if presolve:
+                model = self._presolve(model, consistency)
+            if model is not None and self._assumptions:
+                restricted = model.with_domains({name: (value,) for name, value in self._assumptions.items()})
+                if presolve:
+                    restricted = self._presolve_assumptions(model, restricted, consistency)
+                model = restricted
+            if model is None or not all(model.domains):
+                self.stats['status'] = 'infeasible'
+                return None if take_first else []
+            self._search_model = model
+            result = self.ALGORITHMS[algorithm](take_first, **kwargs)
+            if result:
+                self.last_solution = result if take_first else result[0]
+            return result
+        except BudgetExhausted as e:  # during presolve
+            self.stats['status'] = e.status
+            return None if take_first else []
+        finally:
+            self._assumptions = {}
+            self._search_model = None
+            self.stats['nodes'] = self.budget.nodes
+            self.stats['elapsed'] = self.budget.elapsed()
+
+    def _presolve(self, model, consistency=True):
+        """Presolves MODEL, reusing the previous result if MODEL hasn't changed since.
+        If MODEL only adds constraints to the previously presolved model, starts from the previous domains
+        and propagates only from the new constraints.
+        """
+        cached = self._presolved
+        if cached is None or cached[0] is not model or cached[1] != consistency:
+            previous = cached[0] if cached is not None and cached[1] == consistency else None
+            if previous is not None and self._extends(model, previous):
+                if cached[2] is None:  # still infeasible
+                    result, stats = None, dict(cached[3], constraints_removed=0, values_removed=0)
+                else:
+                    new_constraints = range(len(previous.constraints), len(model.constraints))
+                    result, stats = presolve_model(model, consistency, self.budget, domains=cached[2].domains,
+                                                   new_constraints=new_constraints)
+            else:
+                result, stats = presolve_model(model, consistency, self.budget)
+            cached = self._presolved = (model, consistency, result, stats)
+        self.stats['presolve'] = cached[3]
+        return cached[2]
+
+    def _presolve_assumptions(self, model, restricted, consistency=True):
+        """Presolves RESTRICTED, which is the (already presolved) MODEL with the assumptions' domains applied.
+        Only the variables fixed by the assumptions, and any others that end up with a single value, are propagated
+        (full arc consistency would revisit most of the model, and the search's forward checking does the rest).
+        """
+        changed_vars = [i for i, (a, b) in enumerate(zip(restricted.domains, model.domains)) if len(a) < len(b)]
+        restricted, stats = presolve_model(restricted, consistency, self.budget, domains=restricted.domains,
+                                           changed_vars=changed_vars, singletons_only=True)
+        base_stats = self.stats['presolve']
+        self.stats['presolve'] = {
+            'constraints_removed': base_stats['constraints_removed'] + stats['constraints_removed'],
+            'values_removed': base_stats['values_removed'] + stats['values_removed'],
+            'infeasible': stats['infeasible'],
+        }
+        return restricted
+
+    @staticmethod
+    def _extends(model, previous):
+        """Returns True if MODEL is PREVIOUS with (zero or more) constraints added."""
+        num_constraints = len(previous.constraints)
+        return (model.var_names is previous.var_names and model.domains is previous.domains
+                and model.constraints[:num_constraints] == previous.constraints)
+
+    @property
+    def model(self):
+        """The compiled model being solved, including any constraints added through `add_constraint`.
+        It is compiled from `self.csp` on first use and shared by every subsequent solve,
+        unless `self.csp` has been edited since (variables, domains, values, constraints or objective function),
+        in which case it is recompiled.
+        """
+        if self.csp is not None and self._base_model is not None and self._csp_changed():
+            self._base_model = self._model = None
+            self._domain_order = {}
+        if self._model is None:
+            if self._base_model is None:
+                self._base_model = self.csp.compile()
+            extra_constraints = [c for scope in self._scopes for c in scope]
+            self._model = self._base_model.with_constraints(extra_constraints)
+        return self._model
+
+    def _csp_changed(self):
+        """Returns True if `self.csp` no longer matches the model it was compiled into."""
+        csp, model = self.csp, self._base_model
+        if (len(csp.var_list) != len(model) or csp.objective_fn is not model.objective_fn
+                or tuple(csp.constraints) != model.constraints):
+            return True
+        for var, name, domain, value in zip(csp.var_list, model.var_names, model.domains, model.values):
+            if var.name != name or var.value != value:
+                return True
+            if value is None and var.domain is not domain and frozenset(var.domain) != domain:
+                return True
+        return False
+
+    ###################
+    # INCREMENTAL API #
+    ###################
+
+    def push(self):
+        """Opens a new constraint scope. Constraints added from now on are removed by the matching `pop`."""
+        self._scopes.append([])
+
+    def pop(self):
+        """Discards every constraint added since the most recent `push`."""
+        if len(self._scopes) == 1:
+            raise IndexError('pop without a matching push')
+        if self._scopes.pop():
+            self._model = None
+
+    def add_constraint(self, constraint):
+        """Adds a constraint to the current scope (and to every subsequent solve, until it is popped)."""
+        self._scopes[-1].append(constraint)
+        self._model = None
+
+    def current_model(self):
+        """Returns the model being solved, with assumptions and presolving applied."""
+        if self._search_model is None:
+            return self.model.with_domains({name: (value,) for name, value in self._assumptions.items()})
+        return self._search_model
+
+    def new_state(self):
+        """Returns fresh search state for the model being solved."""
+        return self.current_model().new_state()
+
+    def _record_best(self, assignment):
+        """Keeps track of the best assignment seen so far (in case the search is cut short)."""
+        self.stats['best'] = assignment
 
     ###################################
     # BACKTRACKING SEARCH + UTILITIES #
     ###################################
 
-    def backtracking(self, take_first=True, verbose=False, progress_freq=1e4):
+    def backtracking(self, take_first=True, verbose=False, progress_freq=1e4, warm_start=True):
         """Backtracking search with forward checking.
-        Returns the solution (or, if TAKE_FIRST is False, the set of all solutions) to the CSP given by `self.csp`.
+        Returns the solution (or, if TAKE_FIRST is False, the set of all solutions) to the CSP given by `self.model`.
         If no solutions exist, returns False.
+        If WARM_START is True, values from the solver's previous solution are tried first.
         """
-        _csp = copy.deepcopy(self.csp)
+        _csp = self.new_state()
         solutions = []
 
-        # Order domains (we only want to do this once)
-        _domains = {}
-        for var in _csp.var_list:
-            _domains[var.name] = self.order_domain(var, _csp)
+        # Order domains (we only want to do this once per solver, unless the domains grow)
+        _domains = self._domain_order
+        try:
+            for var in _csp.var_list:
+                if var.name not in _domains or not set(_domains[var.name]).issuperset(var.domain):
+                    self.budget.check()
+                    _domains[var.name] = self.order_domain(var, _csp)
+        except BudgetExhausted as e:
+            self.stats['status'] = e.status
+            return None if take_first else solutions
+
+        if warm_start and self.last_solution is not None:
+            # Try the previous solution's values first
+            _domains = {name: self._warm_start_order(name, order) for name, order in _domains.items()}
+
+        try:
+            solution = self._backtrack(_csp, _domains, take_first, solutions, self.budget, verbose, progress_freq)
+            self.stats['status'] = 'solved' if solutions else 'infeasible'
+        except BudgetExhausted as e:
+            solution = None
+            self.stats['status'] = e.status
+        return solution if take_first else solutions
 
-        info = {'i': 0}
-        def _recursive_backtracking(_csp):
+    def _backtrack(self, _csp, _domains, take_first, solutions, budget,
+                   verbose=False, progress_freq=1e4, record_best=True):
+        """The recursive core of `backtracking`.
+        Extends the current assignment in _CSP, trying values in the orders given by _DOMAINS,
+        and appends every complete assignment to SOLUTIONS. BUDGET is ticked once per search node.
+        Returns the first solution found if TAKE_FIRST is True.
+        """
+        info = {'i': 0, 'depth': -1}
+        def _recursive_backtracking(_csp, depth):
             info['i'] += 1
+            budget.tick()
+            if record_best and depth > info['depth']:
+                info['depth'] = depth
+                self._record_best({var.name: var.value for var in _csp.var_list if var.value is not None})
             if info['i'] % progress_freq == 0:
                 print('[iteration %s] %d/%d constraints violated'
                       % (str(info['i']).rjust(9), _csp.num_constraints_violated(), len(_csp.constraints)))
@@ -74,14 +281,20 @@ class Solver(object):
                 undo_assign = self.make_assignment([next_var], [next_value])
                 if self.consistent(next_var.name, _csp):
                     orig_domains = self.forward_check([next_var], _csp)
-                    _solution = _recursive_backtracking(_csp)
+                    _solution = _recursive_backtracking(_csp, depth + 1)
                     if _solution is not None and take_first:
                         return _solution
                     self.restore_domains(orig_domains, _csp)
                 self.make_assignment(*undo_assign)
 
-        solution = _recursive_backtracking(_csp)
-        return solution if take_first else solutions
+        return _recursive_backtracking(_csp, len(_csp.get_assigned_vars()))
+
+    def _warm_start_order(self, name, order):
+        """Moves the previous solution's value for variable NAME to the front of ORDER."""
+        value = self.last_solution.get(name)
+        if value is None or value not in order:
+            return order
+        return [value] + [v for v in order if v != value]
 
     @staticmethod
     def select_unassigned_var(var_list):
@@ -98,8 +311,9 @@ class Solver(object):
             """If the value VALUE is chosen for VAR, see/return how many values in total are pruned
             from the domains of other variables.
             """
+            self.budget.step()
             init_total = sum([len(_v.domain) for _v in other_vars])
-            _other_vars = copy.deepcopy(other_vars)
+            _other_vars = [copy.copy(_v) for _v in other_vars]  # domains are replaced, never mutated
             for constraint in csp.constraints:
                 if var.name not in constraint.var_names:
                     continue
@@ -189,44 +403,68 @@ class Solver(object):
         """Returns True if the current assignment of the variable VAR_NAME doesn't violate any constraints.
         Assumes that a constraint involving unassigned variables can still be satisfied.
         """
-        for constraint in csp.constraints:
-            if var_name in constraint.var_names:
-                arg_list = [csp.var_dict[name] for name in constraint.var_names]
-                if None in arg_list:
-                    continue
-                if not constraint.satisfied(*arg_list):
-                    return False
+        for constraint in csp.get_constraints_with(csp.var_dict[var_name]):
+            arg_list = [csp.var_dict[name] for name in constraint.var_names]
+            if None in arg_list:
+                continue
+            if not constraint.satisfied(*arg_list):
+                return False
         return True
 
     #################
     # MIN CONFLICTS #
     #################
 
-    def min_conflicts(self, take_first=True, iter_limit=1e9, progress_freq=1e4, uniqueness=False):
+    def min_conflicts(self, take_first=True, iter_limit=1e9, progress_freq=1e4, uniqueness=False, warm_start=True):
         """Local search / iterative improvement.
-        Solves the CSP given by `self.csp`.
+        Solves the CSP given by `self.model`.
+        If WARM_START is True, the search starts from the solver's previous solution (wherever it's still valid).
         """
-        _csp = copy.deepcopy(self.csp)
+        _csp = self.new_state()
         solutions = []
         self.make_random_assignment(_csp, uniqueness)
-        i = 0
-        while i < iter_limit:
-            if _csp.solved():
-                solution = {var.name: var.value for var in _csp.var_list}
-                if take_first:
-                    return solution
-                else:
-                    solutions.append(solution)
-            # Select variable that violates the most constraints
-            mc_var = self.select_most_conflicting_var(_csp)
-            # Reset that variable to the value that violates the fewest constraints
-            self.assign_least_conflicting_value(mc_var, _csp, uniqueness)
-            i += 1
-            if progress_freq > 0 and (i + 1) % progress_freq == 0:
-                print('[iteration %s] %d/%d constraints violated'
-                      % (str(i).rjust(9), _csp.num_constraints_violated(), len(_csp.constraints)))
+        if warm_start:
+            self._warm_start_assignment(_csp)
+        i, best_num_violated = 0, None
+        try:
+            while i < iter_limit:
+                self.budget.step()
+                num_violated = _csp.num_constraints_violated()
+                if best_num_violated is None or num_violated < best_num_violated:
+                    best_num_violated = num_violated
+                    self._record_best({var.name: var.value for var in _csp.var_list})
+                if num_violated == 0:
+                    solution = {var.name: var.value for var in _csp.var_list}
+                    if take_first:
+                        self.stats['status'] = 'solved'
+                        return solution
+                    else:
+                        solutions.append(solution)
+                # Select variable that violates the most constraints
+                mc_var = self.select_most_conflicting_var(_csp)
+                if mc_var is None:  # the violated constraints only involve variables with a single value
+                    self.stats['status'] = 'infeasible'
+                    return None if take_first else solutions
+                # Reset that variable to the value that violates the fewest constraints
+                self.assign_least_conflicting_value(mc_var, _csp, uniqueness, self.budget)
+                i += 1
+                if progress_freq > 0 and (i + 1) % progress_freq == 0:
+                    print('[iteration %s] %d/%d constraints violated'
+                          % (str(i).rjust(9), _csp.num_constraints_violated(), len(_csp.constraints)))
+            self.stats['status'] = 'iter_limit'
+        except BudgetExhausted as e:
+            self.stats['status'] = e.status
         return None if take_first else solutions
 
+    def _warm_start_assignment(self, csp):
+        """Assigns the solver's previous solution (if any) to the variables of CSP, wherever it's still valid."""
+        if self.last_solution is None:
+            return
+        for var in csp.var_list:
+            value = self.last_solution.get(var.name)
+            if value is not None and value in var.init_domain:
+                self.make_assignment([var], [value])
+
     @staticmethod
     def make_random_assignment(csp, uniqueness=False):
         """Assigns a random value from each variable's domain to that variable.
@@ -244,21 +482,27 @@ class Solver(object):
     @staticmethod
     def select_most_conflicting_var(csp):
         """Return the variable from CSP that violates the most constraints.
+        Variables with a single value (e.g. fixed by assumptions or presolving) can't be changed, so they are skipped;
+        returns None if only such variables are in conflict.
         Assumes that all of the variables in CSP are initially assigned.
         """
         conflict_count = defaultdict(int)
         for constraint in csp.constraints:
             if not constraint.satisfied(*[csp.var_dict[name] for name in constraint.var_names]):
                 for name in constraint.var_names:
-                    conflict_count[name] += 1
+                    if len(csp.var_dict[name].init_domain) > 1:
+                        conflict_count[name] += 1
+        if not conflict_count:
+            return None
         mc_count = max(conflict_count.values())
         mc_var_name = random.choice([name for name, count in conflict_count.items() if count == mc_count])
         return csp.var_dict[mc_var_name]
 
     @staticmethod
-    def assign_least_conflicting_value(var, csp, uniqueness=False):
+    def assign_least_conflicting_value(var, csp, uniqueness=False, budget=None):
         """Assign to VAR whichever value violates the fewest constraints.
         Assumes that all of the variables in CSP are initially assigned.
+        If BUDGET is given, its clock and cancellation event are checked before each value is scored.
         """
         def _assign_unique_value(_other_var):
             other_domain = _other_var.init_domain - set([_var.value for _var in csp.var_list])
@@ -269,6 +513,8 @@ class Solver(object):
         orig_value = var.value
         conflict_count = {}
         for value in var.init_domain:
+            if budget is not None:
+                budget.check()
             other_var = next((var for var in csp.var_list if var.value == value), None)
             undo_other_assign = ((), (), ())
             Solver.make_assignment([var], [value])
@@ -289,3 +535,370 @@ class Solver(object):
         if uniqueness and other_var is not None:
             _assign_unique_value(other_var)
         return lc_value
+
+    ############################
+    # PERMUTATION LOCAL SEARCH #
+    ############################
+
+    def permutation_search(self, take_first=True, iter_limit=1e9, progress_freq=1e4, noise=0.1, warm_start=True):
+        """Local search over injective assignments (every variable gets a different value),
+        for permutation problems such as N-queens or orderings.
+        The search space is restricted to such assignments whether or not the model's constraints require
+        distinct values, so only use it on problems in which they do: any other solutions are never found.
+        If there is no assignment of distinct values at all, the status is 'infeasible'.
+        Moves either swap the values of two variables or give a variable an unused value,
+        so distinctness never has to be repaired, and each move is scored by re-evaluating
+        only the constraints that involve the variables it changes.
+        With probability NOISE, a random move is made instead of the best one.
+
+        Local search can't enumerate solutions; if TAKE_FIRST is False, returns a list with the solution found.
+        """
+        _csp = self.new_state()
+        model = _csp.model
+        var_list = _csp.var_list
+        domains = [var.domain for var in var_list]
+        args = [[var_list[i] for i in scope] for scope in model.scopes]
+        satisfied = [c.satisfied for c in model.constraints]
+        incidence = model.incidence
+
+        values = self._initial_permutation(domains, warm_start)
+        if values is None:
+            self.stats['status'] = 'infeasible'  # no assignment of distinct values exists
+            return None if take_first else []
+        holder = {value: i for i, value in enumerate(values)}  # value -> index of the variable holding it
+        for var, value in zip(var_list, values):
+            var.value = value
+        violated = [not satisfied[j](*args[j]) for j in range(len(args))]
+        violated_list = [j for j, v in enumerate(violated) if v]  # for O(1) random choice
+        violated_pos = {j: k for k, j in enumerate(violated_list)}
+
+        def _set_violated(j, status):
+            if status == violated[j]:
+                return
+            violated[j] = status
+            if status:
+                violated_pos[j] = len(violated_list)
+                violated_list.append(j)
+            else:
+                k = violated_pos.pop(j)
+                last = violated_list.pop()
+                if last != j:
+                    violated_list[k] = last
+                    violated_pos[last] = k
+
+        def _apply(i, j, value):
+            """Gives variable I the value VALUE; variable J (if not None) takes I's old value."""
+            old_value = values[i]
+            values[i] = var_list[i].value = value
+            holder[value] = i
+            if j is None:
+                del holder[old_value]
+            else:
+                values[j] = var_list[j].value = old_value
+                holder[old_value] = j
+
+        def _affected(i, j):
+            return incidence[i] if j is None else set(incidence[i]).union(incidence[j])
+
+        it, best_num_violated = 0, None
+        try:
+            while it < iter_limit:
+                it += 1
+                self.budget.step()
+                if best_num_violated is None or len(violated_list) < best_num_violated:
+                    best_num_violated = len(violated_list)
+                    self._record_best({var.name: var.value for var in var_list})
+                if not violated_list:
+                    solution = {var.name: var.value for var in var_list}
+                    self.stats['status'] = 'solved'
+                    return solution if take_first else [solution]
+                if progress_freq > 0 and it % progress_freq == 0:
+                    print('[iteration %s] %d/%d constraints violated'
+                          % (str(it).rjust(9), len(violated_list), len(violated)))
+
+                # Pick a variable from a random violated constraint and score its moves
+                i = random.choice(model.scopes[random.choice(violated_list)])
+                moves = []
+                for value in domains[i]:
+                    if value == values[i]:
+                        continue
+                    j = holder.get(value)
+                    if j is not None and values[i] not in domains[j]:
+                        continue
+                    moves.append((j, value))
+                if not moves:
+                    continue
+                if random.random() < noise:
+                    j, value = random.choice(moves)
+                else:
+                    best_delta, best_moves = None, []
+                    for j, value in moves:
+                        affected = _affected(i, j)
+                        old_value = values[i]
+                        _apply(i, j, value)
+                        delta = sum((not satisfied[k](*args[k])) - violated[k] for k in affected)
+                        _apply(i, j, old_value)  # undo
+                        if best_delta is None or delta < best_delta:
+                            best_delta, best_moves = delta, [(j, value)]
+                        elif delta == best_delta:
+                            best_moves.append((j, value))
+                    j, value = random.choice(best_moves)
+                _apply(i, j, value)
+                for k in _affected(i, j):
+                    _set_violated(k, not satisfied[k](*args[k]))
+            self.stats['status'] = 'iter_limit'
+        except BudgetExhausted as e:
+            self.stats['status'] = e.status
+        return None if take_first else []
+
+    def _initial_permutation(self, domains, warm_start=True):
+        """Returns a random injective assignment (a list of values, one per variable, all different),
+        or None if there is none. It is found as a maximum matching between variables and values:
+        starting from the previous solution's values (if WARM_START is True), every unmatched variable
+        gets a value along an augmenting path.
+        """
+        values, holder = [None] * len(domains), {}
+        if warm_start and self.last_solution is not None:
+            for i, name in enumerate(self.current_model().var_names):
+                value = self.last_solution.get(name)
+                if value in domains[i] and value not in holder:
+                    values[i], holder[value] = value, i
+        choices = [random.sample(list(domain), len(domain)) for domain in domains]
+        unmatched = [i for i, value in enumerate(values) if value is None]
+        random.shuffle(unmatched)
+        for i in unmatched:
+            if not self._augment(i, choices, values, holder):
+                return None
+        return values
+
+    @staticmethod
+    def _augment(root, choices, values, holder):
+        """Looks for an augmenting path from the unmatched variable ROOT (depth-first, without recursion),
+        trying the values of each variable in the order given by CHOICES. If there is one, flips it,
+        which updates VALUES (variable -> value) and HOLDER (value -> variable), and returns True.
+        """
+        reached_from = {}  # value -> the variable through which it was reached
+        stack = [(root, iter(choices[root]))]
+        while stack:
+            i, candidates = stack[-1]
+            for value in candidates:
+                if value in reached_from:
+                    continue
+                reached_from[value] = i
+                j = holder.get(value)
+                if j is None:  # a free value: shift every value along the path
+                    while value is not None:
+                        i = reached_from[value]
+                        values[i], holder[value], value = value, i, values[i]
+                    return True
+                stack.append((j, iter(choices[j])))
+                break
+            else:
+                stack.pop()
+        return False
+
+    #############################
+    # LARGE NEIGHBORHOOD SEARCH #
+    #############################
+
+    def lns(self, take_first=True, iter_limit=1e9, sub_node_limit=1e3, min_size=2, max_size=None,
+            stall_limit=200, progress_freq=1e4, warm_start=True):
+        """Large neighborhood search.
+        Starting from an incumbent (the solver's previous solution, or else a random assignment), repeatedly relaxes
+        a neighborhood of variables connected through shared constraints and re-solves only those variables
+        with backtracking search, using at most SUB_NODE_LIMIT nodes per neighborhood.
+        Assignments are ranked by the number of constraints they violate and then by the objective function,
+        which is called as `objective_fn(*var_list)`. A re-solved neighborhood that improves the ranking is accepted.
+        The neighborhood size adapts between MIN_SIZE and MAX_SIZE variables: it grows after every failure
+        and shrinks after every success.
+
+        Without an objective function, returns as soon as a solution is found. With one, keeps improving
+        the incumbent until ITER_LIMIT iterations have passed, the budget runs out, a complete search
+        over all variables has finished, or STALL_LIMIT consecutive iterations have brought no improvement
+        (status 'stalled'), and then returns the best solution found.
+        If TAKE_FIRST is False, returns a list containing that solution.
+        """
+        _csp = self.new_state()
+        model = _csp.model
+        var_list = _csp.var_list
+        objective_fn = model.objective_fn
+        max_size = len(var_list) if max_size is None else min(max_size, len(var_list))
+        min_size = min(min_size, max_size)
+        neighbors = [set() for _ in var_list]
+        for scope in model.scopes:
+            for i in scope:
+                neighbors[i].update(scope)
+        for i, _neighbors in enumerate(neighbors):
+            _neighbors.discard(i)
+
+        # Initial incumbent
+        self.make_random_assignment(_csp)
+        if warm_start:
+            self._warm_start_assignment(_csp)
+        incumbent = [var.value for var in var_list]
+        score, violated = self._lns_score(_csp)
+        self._record_best({var.name: var.value for var in var_list})
+
+        it, size, proven, stalled = 0, min_size, False, 0
+        try:
+            while it < iter_limit and not (score[0] == 0 and objective_fn is None):
+                if stalled >= stall_limit:
+                    break
+                it += 1
+                self.budget.step()
+                if progress_freq > 0 and it % progress_freq == 0:
+                    print('[iteration %s] %d/%d constraints violated, neighborhood size %d'
+                          % (str(it).rjust(9), score[0], len(model.constraints), size))
+
+                # Relax a neighborhood and re-solve it, keeping every other variable fixed
+                relaxed = self._select_neighborhood(neighbors, violated, model.scopes, size)
+                for i, var in enumerate(var_list):
+                    if i in relaxed:
+                        var.value, var.domain = None, var.init_domain
+                    else:
+                        var.value, var.domain = incumbent[i], {incumbent[i]}
+                _domains = {}
+                for i in relaxed:
+                    others = [v for v in var_list[i].init_domain if v != incumbent[i]]
+                    random.shuffle(others)
+                    _domains[var_list[i].name] = [incumbent[i]] + others
+                solutions, complete = [], True
+                try:
+                    self._backtrack(_csp, _domains, objective_fn is None, solutions,
+                                    self.budget.sub_budget(sub_node_limit), progress_freq=float('inf'), record_best=False)
+                except BudgetExhausted as e:
+                    if e.status != 'node_limit' or self.budget.status is not None:
+                        raise
+                    complete = False
+
+                # Accept the best re-solved assignment if it's an improvement
+                improved = False
+                for solution in solutions:
+                    for var in var_list:
+                        var.value = solution[var.name]
+                    _score, _violated = self._lns_score(_csp)
+                    if _score < score:
+                        score, violated, improved = _score, _violated, True
+                        incumbent = [var.value for var in var_list]
+                stalled = 0 if improved else stalled + 1
+                if improved:
+                    self._record_best(dict(zip(model.var_names, incumbent)))
+                    size = max(min_size, size - 1)
+                elif complete and len(relaxed) == len(var_list):
+                    proven = True  # the whole problem has been searched exhaustively
+                    break
+                else:
+                    size = min(max_size, size + 1)
+            if score[0] == 0:
+                self.stats['status'] = 'solved'
+            elif proven:
+                self.stats['status'] = 'infeasible'
+            else:
+                self.stats['status'] = 'stalled' if stalled >= stall_limit else 'iter_limit'
+        except BudgetExhausted as e:
+            self.stats['status'] = e.status
+        if score[0] != 0:
+            return None if take_first else []
+        solution = dict(zip(model.var_names, incumbent))
+        return solution if take_first else [solution]
+
+    @staticmethod
+    def _lns_score(csp):
+        """Ranks the current (complete) assignment in CSP; lower is better.
+        Returns the rank and the indices of the violated constraints.
+        """
+        violated = [j for j, c in enumerate(csp.constraints)
+                    if not c.satisfied(*[csp.var_dict[name] for name in c.var_names])]
+        objective = 0
+        if csp.objective_fn is not None:
+            objective = csp.objective_fn(*csp.var_list)
+        return (len(violated), -objective), violated
+
+    @staticmethod
+    def _select_neighborhood(neighbors, violated, scopes, size):
+        """Returns the ids of SIZE variables, grown breadth-first through the constraint graph from a seed variable.
+        The seed is taken from a violated constraint if there is one.
+        """
+        num_vars = len(neighbors)
+        seed = random.choice(scopes[random.choice(violated)]) if violated else random.randrange(num_vars)
+        relaxed, frontier = {seed}, [seed]
+        while len(relaxed) < size:
+            if not frontier:  # the seed's component is exhausted; jump to a random other variable
+                frontier = [random.choice([i for i in range(num_vars) if i not in relaxed])]
+                relaxed.add(frontier[0])
+                continue
+            next_frontier = []
+            for i in frontier:
+                candidates = [k for k in neighbors[i] if k not in relaxed]
+                random.shuffle(candidates)
+                for k in candidates[:size - len(relaxed)]:
+                    relaxed.add(k)
+                    next_frontier.append(k)
+            frontier = next_frontier
+        return relaxed
+
+    ######################
+    # TREE DECOMPOSITION #
+    ######################
+
+    def tree_decomposition(self, take_first=True, max_width=None):
+        """Dynamic programming over a tree decomposition of the constraint graph (see `cspy.decomposition`).
+        Time and memory grow exponentially with the width of the decomposition but only linearly
+        with the number of variables, which suits nearly tree-structured problems.
+        The number of solutions is recorded in `self.stats['count']`, and the width in `self.stats['width']`.
+        If MAX_WIDTH is given, wider decompositions are rejected with a ValueError.
+        The objective function is not taken into account.
+        """
+        decomposition = TreeDecomposition(self.current_model())
+        self.stats['width'] = decomposition.width
+        if max_width is not None and decomposition.width > max_width:
+            raise ValueError('tree decomposition has width %d (> %d)' % (decomposition.width, max_width))
+        try:
+            self.stats['count'] = decomposition.count(self.budget)
+        except BudgetExhausted as e:
+            self.stats['status'] = e.status
+            return None if take_first else []
+        self.stats['status'] = 'solved' if self.stats['count'] else 'infeasible'
+        solutions = decomposition.solutions()
+        return next(solutions, None) if take_first else list(solutions)
+
+    ###############
+    # EXACT COVER #
+    ###############
+
+    def exact_cover(self, take_first=True):
+        """Algorithm X with Dancing Links, for "one of each" problems such as Sudoku (see `cspy.exact_cover`).
+        Only applies to CSPs whose constraints are all unary, `uniqueness` or `inequality` constraints;
+        raises a ValueError otherwise. The objective function is not taken into account.
+        """
+        solutions = []
+        try:
+            for solution in ExactCover(self.current_model()).solutions(self.budget):
+                solutions.append(solution)
+                if take_first:
+                    break
+            self.stats['status'] = 'solved' if solutions else 'infeasible'
+        except BudgetExhausted as e:
+            self.stats['status'] = e.status
+        if take_first:
+            return solutions[0] if solutions else None
+        return solutions
+
+    def iter_exact_covers(self, time_limit=None, node_limit=None, cancel_event=None):
+        """Yields the solutions found by `exact_cover` one at a time, as they are found (without presolving).
+        The stream has a budget of its own: it simply ends after TIME_LIMIT seconds or NODE_LIMIT nodes,
+        or once CANCEL_EVENT is set. Afterward, `self.stats['status']` says why it ended.
+        """
+        budget = Budget(time_limit, node_limit, cancel_event)
+        self.stats = {'status': None, 'nodes': 0, 'elapsed': 0.0, 'best': None}
+        found = False
+        try:
+            for solution in ExactCover(self.current_model()).solutions(budget):
+                found = True
+                yield solution
+            self.stats['status'] = 'solved' if found else 'infeasible'
+        except BudgetExhausted as e:
+            self.stats['status'] = e.status
+        finally:
+            self.stats['nodes'] = budget.nodes
+            self.stats['elapsed'] = budget.elapsed()
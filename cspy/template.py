@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""
+template.py
+
+Templates for solving many instances of the same problem.
+A template holds the compiled variables and constraints once;
+each instance then only specifies how the variables' domains are restricted.
+"""
+
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from cspy.model import CompiledCSP
+from cspy.solver import Solver
+
+_TEMPLATE = None  # the template resident in a worker process
+
+
+def _init_worker(template):
+    global _TEMPLATE
+    _TEMPLATE = template
+
+
+def _solve_instance(index, domains, algorithm, take_first, kwargs):
+    return (index,) + _TEMPLATE.solve_with_stats(domains, algorithm=algorithm, take_first=take_first, **kwargs)
+
+
+class CSPTemplate(object):
+    """A template for a family of same-shaped CSPs.
+    Build it from a CSP containing every variable (with its widest domain) and every constraint.
+    """
+    def __init__(self, csp):
+        self.model = csp if isinstance(csp, CompiledCSP) else csp.compile()
+
+    def instantiate(self, domains):
+        """Returns the compiled model for one instance.
+        DOMAINS is a {name: domain} dictionary of restrictions, e.g. {'00': (5,)} to fix a Sudoku cell.
+        """
+        return self.model.with_domains(domains)
+
+    def solve(self, domains, algorithm='backtracking', take_first=True, **kwargs):
+        """Solves a single instance (see `instantiate`)."""
+        return self.solve_with_stats(domains, algorithm=algorithm, take_first=take_first, **kwargs)[0]
+
+    def solve_with_stats(self, domains, algorithm='backtracking', take_first=True, **kwargs):
+        """Solves a single instance and returns a (solution, stats) tuple; see `Solver.solve` for `stats`."""
+        solver = Solver(self.instantiate(domains))
+        solution = solver.solve(algorithm=algorithm, take_first=take_first, **kwargs)
+        return solution, solver.stats
+
+    def solve_batch(self, instances, workers=None, ordered=True, algorithm='backtracking', take_first=True,
+                    max_pending=None, **kwargs):
+        """Solves every instance in INSTANCES (an iterable of domain restrictions, see `instantiate`).
+        Yields (index, solution, stats) tuples: in input order if ORDERED is True, otherwise as they complete.
+        `stats['status']` tells a proof of infeasibility apart from a search cut short by `time_limit` or `node_limit`.
+
+        If WORKERS is greater than 1, instances are solved by a pool of that many processes, each of which keeps
+        the template resident. Since constraints are typically lambdas, which can't be pickled, the template
+        is handed to the workers by forking; on platforms without `fork`, WORKERS must be 1 (or None).
+        INSTANCES is consumed lazily, with at most MAX_PENDING (by default, twice WORKERS) instances in flight,
+        so it may be a generator over arbitrarily many instances.
+        """
+        if workers is None or workers <= 1:
+            for index, domains in enumerate(instances):
+                yield (index,) + self.solve_with_stats(domains, algorithm=algorithm, take_first=take_first, **kwargs)
+            return
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise NotImplementedError('parallel batch solving requires the fork start method')
+        max_pending = 2 * workers if max_pending is None else max(1, max_pending)
+        instances = enumerate(instances)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+                                 initializer=_init_worker, initargs=(self,)) as executor:
+            def _submit(n):
+                return [executor.submit(_solve_instance, index, domains, algorithm, take_first, kwargs)
+                        for index, domains in itertools.islice(instances, n)]
+            if ordered:
+                pending = deque(_submit(max_pending))
+                while pending:
+                    result = pending.popleft().result()
+                    pending.extend(_submit(1))
+                    yield result
+            else:
+                pending = set(_submit(max_pending))
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    pending.update(_submit(len(done)))
+                    for future in done:
+                        yield future.result()
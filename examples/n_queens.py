@@ -18,7 +18,7 @@ from cspy import Variable, Constraint, CSP
 N         = 8
 VARIABLES = 'pieces'  # either 'squares' or 'pieces'. For efficiency, choose 'pieces'.
 PLOT_SOLN = True
-ALGORITHM = 'min_conflicts'  # either 'backtracking' or 'min_conflicts'. For efficiency, choose 'min_conflicts'.
+ALGORITHM = 'min_conflicts'  # 'backtracking', 'min_conflicts' or 'permutation' (local search over distinct values)
 
 # Given an N x N chessboard, can we find a configuration in which to place N queens
 # on the board such that no two queens attack each other?
@@ -15,6 +15,7 @@ from cspy.utils import merge_dicts
 from cspy.common_constraints import uniqueness, inequality_unary
 
 N = 9
+ALGORITHM = 'exact_cover'  # either 'backtracking' or 'exact_cover'. For efficiency, choose 'exact_cover'.
 DOMAIN = tuple(range(1, N + 1))
 FIXED_VALUES = {
     (0, 0): 5, (0, 1): 3, (0, 4): 7,
@@ -90,7 +91,7 @@ if __name__ == '__main__':
         for name in box_positions:
             for val in fixed:
                 csp.add_constraint(inequality_unary(name, val))
-    solution = csp.get_solution(algorithm='backtracking')
+    solution = csp.get_solution(algorithm=ALGORITHM)
     if solution is None:
         solution = {}
     _solution = {from_name(k): v for k, v in solution.items()}
@@ -8,9 +8,11 @@ Solves https://upload.wikimedia.org/wikipedia/commons/0/08/Sudoku6x6-sol2.png.
 """
 
 import numpy as np
-from cspy import Variable, Constraint, CSP
+from cspy import Variable, CSP
+from cspy.common_constraints import uniqueness, inequality_unary
 
 N = 6
+ALGORITHM = 'exact_cover'  # either 'backtracking' or 'exact_cover'. For efficiency, choose 'exact_cover'.
 DOMAIN = tuple(range(1, N + 1))
 FIXED_VALUES = {
     (0, 0): 2, (0, 5): 3,
@@ -21,23 +23,6 @@ FIXED_VALUES = {
     (5, 0): 3, (5, 5): 2,
 }
 
-def contains_all(iterable):
-    """Returns True if the given iterable contains all of the digits from 1 through N.
-    >>> contains_all([1, 2, 3, 4, 5, 6])
-    True
-    >>> contains_all([2, 6, 4, 5, 1, 3])
-    True
-    >>> contains_all([2, 6, 4, 5, 1])
-    False
-    >>> contains_all([3, 5, 2, 4, 0, 1])
-    False
-    """
-    return all(d in iterable for d in DOMAIN)
-
-def values(var_list):
-    """Takes in a list of variables and returns a list of those variables' values."""
-    return [v.value for v in var_list]
-
 if __name__ == '__main__':
     csp = CSP()
     for r in range(N):
@@ -60,16 +45,14 @@ if __name__ == '__main__':
                     else:
                         fixed.append(val)
             by_box.append((box, fixed))
-    for row_positions, fixed in by_row:
-        satisfied = (lambda fixed: lambda *args: contains_all(fixed + values(args)))(fixed)
-        csp.add_constraint(Constraint(row_positions, satisfied))
-    for col_positions, fixed in by_col:
-        satisfied = (lambda fixed: lambda *args: contains_all(fixed + values(args)))(fixed)
-        csp.add_constraint(Constraint(col_positions, satisfied))
-    for box_positions, fixed in by_box:
-        satisfied = (lambda fixed: lambda *args: contains_all(fixed + values(args)))(fixed)
-        csp.add_constraint(Constraint(box_positions, satisfied))
-    solution = csp.get_solution(algorithm='backtracking')
+    # Each row, column and box must contain every digit: its free cells take distinct values,
+    # none of which may be one of the fixed values in that row, column or box
+    for positions, fixed in by_row + by_col + by_box:
+        csp.add_constraint(uniqueness(positions))
+        for name in positions:
+            for val in fixed:
+                csp.add_constraint(inequality_unary(name, val))
+    solution = csp.get_solution(algorithm=ALGORITHM)
     if solution is None:
         print(solution)
     else: